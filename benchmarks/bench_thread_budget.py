@@ -0,0 +1,128 @@
+"""
+Time-to-result jitter with and without the runtime resource configuration.
+
+Simulates the line PC with the thread layout of the service: decode workers
+convert synthetic camera frames containing a QR code the way GalaxyCamera.read
+does and decode them, while an evidence writer on the I/O side keeps encoding
+JPEGs. Each configuration is run in a fresh process so OpenCV's thread pool and
+affinity settings don't leak between runs.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_thread_budget
+    DECODE_CPUS=1-3 IO_CPUS=0 python -m benchmarks.bench_thread_budget
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+FRAME_SHAPE = (1536, 2048, 3)
+REQUESTS = 200
+WORKERS = 2
+
+
+def _make_frame():
+    """Build a BGR frame with a QR code in the middle."""
+    import cv2
+    import numpy as np
+
+    qr = cv2.QRCodeEncoder.create().encode('ORDER-0001|CASE')
+    qr = cv2.resize(qr, None, fx=12, fy=12, interpolation=cv2.INTER_NEAREST)
+    frame = np.full(FRAME_SHAPE, 200, dtype=np.uint8)
+    y = (FRAME_SHAPE[0] - qr.shape[0]) // 2
+    x = (FRAME_SHAPE[1] - qr.shape[1]) // 2
+    frame[y:y + qr.shape[0], x:x + qr.shape[1]] = qr[..., None]
+    return frame
+
+
+def _run(budgeted):
+    """Run the workload in this process and return the per-request latencies (ms)."""
+    import cv2
+    from pyzbar.pyzbar import decode
+    from src.utils import resources
+
+    if budgeted:
+        resources.apply_resource_config()
+
+    frame = _make_frame()
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    stop = threading.Event()
+
+    def evidence_load():
+        # JPEG encoding like the evidence writers
+        if budgeted:
+            resources.pin_current_thread('io')
+        while not stop.is_set():
+            cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+    latencies = []
+    lock = threading.Lock()
+    per_worker = REQUESTS // WORKERS
+
+    def decode_worker():
+        if budgeted:
+            resources.pin_current_thread('decode')
+        for _ in range(per_worker):
+            start = time.perf_counter()
+            # Acquisition runs on the decode workers, as in GalaxyCamera.read
+            bgr = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2BGR)
+            gray = cv2.cvtColor(bgr, cv2.COLOR_BGR2GRAY)
+            if not decode(gray):
+                raise RuntimeError('QR code not decoded')
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+
+    loader = threading.Thread(target=evidence_load, daemon=True)
+    loader.start()
+    workers = [threading.Thread(target=decode_worker) for _ in range(WORKERS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    stop.set()
+    loader.join()
+    return latencies
+
+
+def _summarize(name, latencies):
+    """Print latency statistics for one configuration."""
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    print(f"{name:<10} mean={statistics.mean(ordered):7.2f} ms  "
+          f"p50={percentile(50):7.2f}  p95={percentile(95):7.2f}  "
+          f"p99={percentile(99):7.2f}  stdev={statistics.stdev(ordered):6.2f}")
+    return statistics.stdev(ordered)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        print(json.dumps(_run(sys.argv[2] == 'budgeted')))
+        return
+
+    results = {}
+    for mode in ('default', 'budgeted'):
+        env = dict(os.environ)
+        if mode == 'default':
+            # Leave OpenCV's thread pool at its default and don't pin anything
+            env.update({'OPENCV_THREADS': '-1', 'DECODE_CPUS': '', 'IO_CPUS': ''})
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_thread_budget', '--child', mode],
+            env=env, check=True, capture_output=True, text=True
+        ).stdout
+        results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{REQUESTS} requests, {WORKERS} decode workers, frame {FRAME_SHAPE[1]}x{FRAME_SHAPE[0]}")
+    default_jitter = _summarize('default', results['default'])
+    budgeted_jitter = _summarize('budgeted', results['budgeted'])
+    print(f"jitter (stdev) reduction: {100 * (1 - budgeted_jitter / default_jitter):.1f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -26,4 +26,48 @@ QUEUE_CONFIG = {
 }
 
 # Logging Configuration
-LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
\ No newline at end of file
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+
+# Inspection Plan Defaults (used when the order RECIPE does not override them)
+INSPECTION_DEFAULTS = {
+    'camera_id': int(os.getenv('DEFAULT_CAMERA_ID', 1)),
+    'timeout': float(os.getenv('DEFAULT_TASK_TIMEOUT', 30)),
+    'decoder': os.getenv('DEFAULT_DECODER', 'pyzbar'),
+}
+
+# Task Execution Configuration
+TASK_EXECUTION_CONFIG = {
+    # Analyses running concurrently; the pika I/O loop stays free to receive
+    # newer START or CANCEL messages that preempt them
+    'workers': int(os.getenv('ANALYSIS_WORKERS', 2)),
+    'prefetch_count': int(os.getenv('RABBITMQ_PREFETCH', 10)),
+}
+
+# Runtime Resource Configuration
+RESOURCE_CONFIG = {
+    # OpenCV internal thread pool size; -1 keeps OpenCV's default
+    'opencv_threads': int(os.getenv('OPENCV_THREADS', 1)),
+    # Linux CPU lists (e.g. '0-1,4') per subsystem; empty means unpinned
+    'cpus': {
+        'decode': os.getenv('DECODE_CPUS', ''),
+        'io': os.getenv('IO_CPUS', ''),
+    },
+}
+
+# Measurement Calibration Configuration
+CALIBRATION_CONFIG = {
+    # Directory holding camera_<id>.npz with mm_per_px, camera_matrix, dist_coeffs
+    'dir': os.getenv('CALIBRATION_DIR', 'calibration'),
+    'default_mm_per_px': float(os.getenv('DEFAULT_MM_PER_PX', 0.1)),
+}
+
+# Evidence Recorder Configuration
+EVIDENCE_CONFIG = {
+    'enabled': os.getenv('EVIDENCE_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+    'output_dir': os.getenv('EVIDENCE_DIR', 'evidence'),
+    'image_format': os.getenv('EVIDENCE_FORMAT', 'jpg'),
+    'max_bytes': int(os.getenv('EVIDENCE_MAX_MB', 1024)) * 1024 * 1024,
+    'queue_size': int(os.getenv('EVIDENCE_QUEUE_SIZE', 32)),
+    'workers': int(os.getenv('EVIDENCE_WORKERS', 2)),
+    'jpeg_quality': int(os.getenv('EVIDENCE_JPEG_QUALITY', 90)),
+}
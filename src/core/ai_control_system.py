@@ -1,11 +1,19 @@
 # src/core/ai_control_system.py
 import json
+import functools
 import pika
 import requests
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional
 from src.utils.logger import setup_logger
-from src.config.settings import RABBITMQ_CONFIG, NODERED_ENDPOINT, QUEUE_CONFIG
+from src.utils.evidence import EvidenceRecorder
+from src.utils.resources import apply_resource_config, pin_current_thread
+from src.config.settings import (
+    RABBITMQ_CONFIG, NODERED_ENDPOINT, QUEUE_CONFIG, EVIDENCE_CONFIG, TASK_EXECUTION_CONFIG
+)
 from .task_analyzer import TaskAnalyzer
+from .inspection_plan import InspectionPlanCache
+from .cancellation import CancellationToken, CancellationRegistry
 
 # Global variable for order data
 current_order_data: Dict[str, Any] = {}
@@ -37,10 +45,36 @@ class AIControlSystem:
             'final_check_task': TaskAnalyzer.final_check_task_analysis
         }
         self.task_analysis_map.setdefault('unknown_task', lambda _: {'status': 'ERROR', 'details': 'Unknown task'})
+        
+        # Asynchronous recorder for the frames behind each result
+        self.evidence_recorder = None
+        if EVIDENCE_CONFIG['enabled']:
+            self.evidence_recorder = EvidenceRecorder(
+                output_dir=EVIDENCE_CONFIG['output_dir'],
+                image_format=EVIDENCE_CONFIG['image_format'],
+                max_bytes=EVIDENCE_CONFIG['max_bytes'],
+                queue_size=EVIDENCE_CONFIG['queue_size'],
+                workers=EVIDENCE_CONFIG['workers'],
+                jpeg_quality=EVIDENCE_CONFIG['jpeg_quality'],
+                initializer=functools.partial(pin_current_thread, 'io')
+            )
                 
         # Reference to global order data
         global current_order_data
         self.order_data = current_order_data
+        
+        # Inspection plans compiled from the order RECIPE, cached per item
+        self.plan_cache = InspectionPlanCache()
+        self.inspection_plans = {}
+        
+        # Running analyses, keyed by station, so newer requests can preempt them
+        self.cancel_registry = CancellationRegistry()
+        self.executor = ThreadPoolExecutor(
+            max_workers=TASK_EXECUTION_CONFIG['workers'],
+            thread_name_prefix='task-analysis',
+            initializer=pin_current_thread,
+            initargs=('decode',)
+        )
 
     def connect_to_rabbitmq(self):
         """
@@ -50,6 +84,9 @@ class AIControlSystem:
             self.connection = pika.BlockingConnection(self.connection_params)
             self.channel = self.connection.channel()
             
+            # Allow enough unacknowledged deliveries for preempting requests to arrive
+            self.channel.basic_qos(prefetch_count=TASK_EXECUTION_CONFIG['prefetch_count'])
+            
             # Declare exchanges and queues
             self.channel.exchange_declare(exchange='NSU', exchange_type='direct')
             
@@ -79,10 +116,18 @@ class AIControlSystem:
                 if field not in message_data:
                     raise ValueError(f"Missing required field: {field}")
 
+            # Compile inspection plans before accepting the order
+            inspection_plans = self.plan_cache.get_plans(message_data)
+            
+            # Work for a previous order is dead once the order changes
+            if message_data['ORDER_NO'] != self.order_data.get('ORDER_NO'):
+                self.cancel_registry.cancel_all('order changed')
+            
             # Update global order data
             global current_order_data
             current_order_data = message_data
             self.order_data = current_order_data
+            self.inspection_plans = inspection_plans
             
             self.logger.info(f"Updated order data: {message_data['ORDER_NO']}")
             
@@ -104,36 +149,56 @@ class AIControlSystem:
         """
         return self.order_data
 
-    def process_task_analysis(self, task_request: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def get_station_key(task_request: Dict[str, Any]) -> str:
         """
-        Process specific task analysis based on task name
+        Get the station a task request belongs to
         
         :param task_request: Task analysis request dictionary
+        :return: STATION field if present, otherwise the task name
+        """
+        return str(task_request.get('STATION') or task_request.get('START', 'UNKNOWN_TASK'))
+
+    def process_task_analysis(self, task_request: Dict[str, Any],
+                              cancel_token: Optional[CancellationToken] = None) -> Dict[str, Any]:
+        """
+        Process specific task analysis based on task name
+        
+        :param task_request: Task analysis request dictionary; an optional DEADLINE
+            (UNIX timestamp) cancels the analysis once it has passed
+        :param cancel_token: Optional token used to cancel the analysis
         :return: Processing results
         """
+        if cancel_token is None:
+            cancel_token = CancellationToken.from_wall_clock(task_request.get('DEADLINE'))
+        
+        # Extract the task name from the request
+        task_name = task_request.get('START', 'UNKNOWN_TASK')
+        
+        # Snapshot the order the request started under; a newer order replaces
+        # self.order_data while this analysis may still be running
+        task_data = {
+            'order_data': self.order_data,
+            'task_request': task_request,
+            'plan': self.inspection_plans.get(task_name),
+            'cancel_token': cancel_token,
+            'evidence': self.evidence_recorder
+        }
+        
         try:
-            # Extract the task name from the request
-            task_name = task_request.get('START', 'UNKNOWN_TASK')
-            
             # Get the appropriate analysis method
             analysis_method = self.task_analysis_map.get(
                 task_name, 
                 lambda: {'error': 'Unknown task'}
             )
             
-            # Include current order data in analysis if available
-            task_data = {
-                'order_data': self.order_data,
-                'task_request': task_request
-            }
-            
             # Perform the specific task analysis
             analysis_result = analysis_method(task_data)
             
             result = {
                 'NAME': task_name,
                 'RESULT': analysis_result.get('status', 'ERROR'),
-                'ORDER_NO': self.order_data.get('ORDER_NO', 'UNKNOWN'),
+                'ORDER_NO': task_data['order_data'].get('ORDER_NO', 'UNKNOWN'),
                 'CONFIDENCE': analysis_result.get('confidence', '0%'),
                 'DETAILS': analysis_result.get('details', 'No details available')
             }
@@ -146,7 +211,7 @@ class AIControlSystem:
             return {
                 'NAME': task_name,
                 'RESULT': 'ERROR',
-                'ORDER_NO': self.order_data.get('ORDER_NO', 'UNKNOWN'),
+                'ORDER_NO': task_data['order_data'].get('ORDER_NO', 'UNKNOWN'),
                 'CONFIDENCE': '0%',
                 'DETAILS': f'Error: {str(e)}'
             }
@@ -171,6 +236,30 @@ class AIControlSystem:
             self.logger.error(f"Failed to send results to Node-RED: {e}")
             raise
 
+    def _run_task_request(self, ch, delivery_tag, task_request: Dict[str, Any],
+                          station: str, cancel_token: CancellationToken):
+        """
+        Run a task analysis on a worker thread and acknowledge it on the I/O thread
+        
+        :param ch: Channel the request was delivered on
+        :param delivery_tag: Delivery tag of the request message
+        :param task_request: Task analysis request dictionary
+        :param station: Station key the request is registered under
+        :param cancel_token: Token used to cancel the analysis
+        """
+        try:
+            result = self.process_task_analysis(task_request, cancel_token)
+            self.send_result_to_node_red(result)
+            callback = functools.partial(ch.basic_ack, delivery_tag=delivery_tag)
+        except Exception as e:
+            self.logger.error(f"Error processing task analysis request: {e}")
+            callback = functools.partial(ch.basic_nack, delivery_tag=delivery_tag, requeue=False)
+        finally:
+            self.cancel_registry.release(station, cancel_token)
+        
+        # pika channels are not thread safe; acknowledge from the connection thread
+        self.connection.add_callback_threadsafe(callback)
+
     def consume_messages(self):
         """
         Consume messages from RabbitMQ queues
@@ -200,14 +289,24 @@ class AIControlSystem:
                     task_request = json.loads(body)
                     self.logger.info(f"Received task analysis request: {task_request}")
                     
-                    # Process the task analysis request
-                    result = self.process_task_analysis(task_request)
+                    # Cancel the running analysis of a station (e.g. the part has left)
+                    if 'CANCEL' in task_request:
+                        station = str(task_request['CANCEL'])
+                        if not self.cancel_registry.cancel(station, 'cancelled by request'):
+                            self.logger.info(f"No running analysis to cancel for {station}")
+                        ch.basic_ack(delivery_tag=method.delivery_tag)
+                        return
                     
-                    # Send result to Node-RED via REST API
-                    self.send_result_to_node_red(result)
+                    # Register first so a newer START preempts the running analysis immediately
+                    station = self.get_station_key(task_request)
+                    cancel_token = CancellationToken.from_wall_clock(task_request.get('DEADLINE'))
+                    self.cancel_registry.register(station, cancel_token)
                     
-                    # Acknowledge message
-                    ch.basic_ack(delivery_tag=method.delivery_tag)
+                    # Process the task analysis request off the I/O thread
+                    self.executor.submit(
+                        self._run_task_request, ch, method.delivery_tag,
+                        task_request, station, cancel_token
+                    )
                 
                 except Exception as e:
                     self.logger.error(f"Error processing task analysis request: {e}")
@@ -230,7 +329,13 @@ class AIControlSystem:
         
         except KeyboardInterrupt:
             self.channel.stop_consuming()
+            self.cancel_registry.cancel_all('shutting down')
+            self.executor.shutdown(wait=True)
+            # Deliver acknowledgements queued by the workers
+            self.connection.process_data_events(time_limit=0)
             self.connection.close()
+            if self.evidence_recorder:
+                self.evidence_recorder.close()
             self.logger.info("Message consuming stopped")
 
     def run(self):
@@ -238,6 +343,8 @@ class AIControlSystem:
         Main method to run the AI control system
         """
         try:
+            # Thread budgets and core pinning; the pika I/O loop runs on this thread
+            apply_resource_config()
             self.connect_to_rabbitmq()
             self.consume_messages()
         except Exception as e:
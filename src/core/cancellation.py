@@ -0,0 +1,142 @@
+import threading
+import time
+from typing import Dict, Optional
+
+
+class CancellationToken:
+    """
+    Cooperative cancellation signal with an optional absolute deadline
+
+    Analyzer loops poll :meth:`is_cancelled` and sleep with :meth:`wait` so that
+    a cancellation wakes them immediately.
+    """
+
+    def __init__(self, deadline: Optional[float] = None):
+        """
+        Initialize the token
+
+        :param deadline: Optional absolute deadline on the ``time.monotonic()`` clock
+        """
+        self.deadline = deadline
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    @classmethod
+    def from_wall_clock(cls, deadline: Optional[float]) -> 'CancellationToken':
+        """
+        Create a token from an absolute deadline in epoch seconds
+
+        :param deadline: Deadline as a UNIX timestamp, or None for no deadline
+        :return: Cancellation token
+        """
+        if deadline is None:
+            return cls()
+        return cls(time.monotonic() + (float(deadline) - time.time()))
+
+    def cancel(self, reason: str = 'cancelled'):
+        """
+        Request cancellation; the first reason given is kept
+
+        :param reason: Human readable cancellation reason
+        """
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def is_cancelled(self) -> bool:
+        """
+        Check whether the token was cancelled or its deadline has passed
+
+        :return: True if the work should stop
+        """
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel('deadline exceeded')
+            return True
+        return False
+
+    def remaining(self) -> Optional[float]:
+        """
+        Get the seconds left until the deadline
+
+        :return: Remaining seconds (never negative) or None if there is no deadline
+        """
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Sleep for up to ``timeout`` seconds, waking early on cancellation
+
+        :param timeout: Maximum seconds to sleep
+        :return: True if the token is cancelled
+        """
+        remaining = self.remaining()
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        self._event.wait(timeout)
+        return self.is_cancelled()
+
+
+class CancellationRegistry:
+    """
+    Tracks the running task of each station so newer work can preempt it
+    """
+
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._tokens: Dict[str, CancellationToken] = {}
+        self._lock = threading.Lock()
+
+    def register(self, key: str, token: CancellationToken):
+        """
+        Register a token for a station, cancelling the one it supersedes
+
+        :param key: Station key
+        :param token: Token of the new task
+        """
+        with self._lock:
+            previous = self._tokens.get(key)
+            self._tokens[key] = token
+        if previous is not None and previous is not token:
+            previous.cancel('superseded by a newer request')
+
+    def release(self, key: str, token: CancellationToken):
+        """
+        Remove a finished task's token if it is still the current one
+
+        :param key: Station key
+        :param token: Token of the finished task
+        """
+        with self._lock:
+            if self._tokens.get(key) is token:
+                del self._tokens[key]
+
+    def cancel(self, key: str, reason: str = 'cancelled') -> bool:
+        """
+        Cancel the running task of a station
+
+        :param key: Station key
+        :param reason: Cancellation reason
+        :return: True if a running task was found
+        """
+        with self._lock:
+            token = self._tokens.pop(key, None)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+
+    def cancel_all(self, reason: str = 'cancelled'):
+        """
+        Cancel every running task
+
+        :param reason: Cancellation reason
+        """
+        with self._lock:
+            tokens = list(self._tokens.values())
+            self._tokens.clear()
+        for token in tokens:
+            token.cancel(reason)
@@ -0,0 +1,199 @@
+import json
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Pattern, Tuple
+
+import numpy as np
+
+from src.config.settings import INSPECTION_DEFAULTS
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+TASK_NAMES = ('case_task', 'box_task', 'cover_task', 'folding_task', 'final_check_task')
+
+SUPPORTED_DECODERS = ('pyzbar', 'opencv')
+
+# Recipe keys that are resolved into dedicated plan fields
+_ACQUISITION_KEYS = {'EXPOSURE_TIME': 'ExposureTime', 'GAIN': 'Gain'}
+_RESERVED_KEYS = {'TASK', 'TASK_NAME', 'CAMERA_ID', 'TIMEOUT', 'ROI', 'DECODER',
+                  'QR_PATTERN'} | set(_ACQUISITION_KEYS)
+
+
+@dataclass(frozen=True)
+class InspectionPlan:
+    """
+    Resolved, ready-to-run settings for one task of one item
+    """
+    item_cd: str
+    task_name: str
+    camera_id: int
+    timeout: float
+    decoder: str = 'pyzbar'
+    roi: Optional[Tuple[int, int, int, int]] = None
+    payload_pattern: Optional[Pattern] = None
+    acquisition: Dict[str, float] = field(default_factory=dict)
+    params: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def default(cls, task_name: str, item_cd: str = 'UNKNOWN') -> 'InspectionPlan':
+        """
+        Build a plan from the configured defaults only
+
+        :param task_name: Name of the task
+        :param item_cd: Item code the plan is for
+        :return: Default inspection plan
+        """
+        return cls(
+            item_cd=item_cd,
+            task_name=task_name,
+            camera_id=INSPECTION_DEFAULTS['camera_id'],
+            timeout=INSPECTION_DEFAULTS['timeout'],
+            decoder=INSPECTION_DEFAULTS['decoder']
+        )
+
+    def crop(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Crop a frame to the plan ROI (a view, no copy)
+
+        :param frame: Image frame from camera
+        :return: ROI of the frame, or the whole frame if no ROI is set
+        """
+        if self.roi is None:
+            return frame
+        x, y, w, h = self.roi
+        return frame[y:y + h, x:x + w]
+
+    def param(self, key: str, default: Any = None, cast: Callable[[Any], Any] = float) -> Any:
+        """
+        Get a task parameter from the recipe
+
+        :param key: Upper-case recipe key
+        :param default: Value returned if the key is missing or empty
+        :param cast: Conversion applied to values found in the recipe
+        :return: Converted parameter value or the default
+        """
+        value = self.params.get(key)
+        if value in (None, ''):
+            return default
+        return cast(value)
+
+    def matches(self, payload: str) -> bool:
+        """
+        Check a decoded payload against the expected pattern
+
+        :param payload: Decoded QR code text
+        :return: True if no pattern is set or the payload matches it
+        """
+        if self.payload_pattern is None:
+            return True
+        return self.payload_pattern.fullmatch(payload) is not None
+
+
+def _parse_roi(value: Any) -> Optional[Tuple[int, int, int, int]]:
+    """Parse an ROI given as [x, y, w, h] or 'x,y,w,h'."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, str):
+        value = value.split(',')
+    roi = tuple(int(v) for v in value)
+    if len(roi) != 4 or roi[2] <= 0 or roi[3] <= 0 or roi[0] < 0 or roi[1] < 0:
+        raise ValueError(f"Invalid ROI: {value}")
+    return roi
+
+
+def _normalize_entry(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Upper-case recipe keys so lookups are case-insensitive."""
+    return {str(key).upper(): value for key, value in entry.items()}
+
+
+def compile_plan(item_cd: str, task_name: str, recipe: List[Dict[str, Any]]) -> InspectionPlan:
+    """
+    Compile the recipe entries of an item into a plan for one task
+
+    Recipe entries without TASK apply to every task; entries with a matching
+    TASK are applied afterwards and take precedence.
+
+    :param item_cd: Item code
+    :param task_name: Name of the task
+    :param recipe: RECIPE list from the order data
+    :return: Compiled inspection plan
+    """
+    settings: Dict[str, Any] = {}
+    entries = [_normalize_entry(entry) for entry in recipe if isinstance(entry, dict)]
+    for entry in entries:
+        if not entry.get('TASK', entry.get('TASK_NAME')):
+            settings.update(entry)
+    for entry in entries:
+        if entry.get('TASK', entry.get('TASK_NAME')) == task_name:
+            settings.update(entry)
+
+    decoder = str(settings.get('DECODER', INSPECTION_DEFAULTS['decoder'])).lower()
+    if decoder not in SUPPORTED_DECODERS:
+        raise ValueError(f"Unsupported decoder for {item_cd}/{task_name}: {decoder}")
+
+    pattern = settings.get('QR_PATTERN')
+    acquisition = {
+        feature: float(settings[key])
+        for key, feature in _ACQUISITION_KEYS.items()
+        if settings.get(key) not in (None, '')
+    }
+    params = {key: value for key, value in settings.items() if key not in _RESERVED_KEYS}
+
+    return InspectionPlan(
+        item_cd=item_cd,
+        task_name=task_name,
+        camera_id=int(settings.get('CAMERA_ID', INSPECTION_DEFAULTS['camera_id'])),
+        timeout=float(settings.get('TIMEOUT', INSPECTION_DEFAULTS['timeout'])),
+        decoder=decoder,
+        roi=_parse_roi(settings.get('ROI')),
+        payload_pattern=re.compile(pattern) if pattern else None,
+        acquisition=acquisition,
+        params=params
+    )
+
+
+class InspectionPlanCache:
+    """
+    Cache of compiled inspection plans keyed by item code and recipe content
+    """
+
+    def __init__(self, max_items: int = 64):
+        """
+        Initialize the plan cache
+
+        :param max_items: Number of item recipes kept before the least recently
+                          used one is discarded
+        """
+        self.max_items = max_items
+        self._plans: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_plans(self, order_data: Dict[str, Any]) -> Dict[str, InspectionPlan]:
+        """
+        Get the compiled plans for the item of an order, compiling them on first use
+
+        :param order_data: Order data received from web
+        :return: Dictionary mapping task name to inspection plan
+        """
+        item_cd = str(order_data.get('ITEM_CD', 'UNKNOWN'))
+        recipe = order_data.get('RECIPE') or []
+        key = (item_cd, json.dumps(recipe, sort_keys=True, default=str))
+
+        with self._lock:
+            plans = self._plans.get(key)
+            if plans is not None:
+                self._plans.move_to_end(key)
+                return plans
+
+        plans = {task_name: compile_plan(item_cd, task_name, recipe) for task_name in TASK_NAMES}
+        logger.info(f"Compiled inspection plans for item {item_cd}")
+
+        with self._lock:
+            self._plans[key] = plans
+            self._plans.move_to_end(key)
+            while len(self._plans) > self.max_items:
+                self._plans.popitem(last=False)
+        return plans
@@ -0,0 +1,387 @@
+import functools
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from src.config.settings import CALIBRATION_CONFIG
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+Roi = Tuple[int, int, int, int]
+
+# Gray-level difference between the class means below which an image is
+# treated as a single class (no box, or a closed seam)
+DEFAULT_MIN_CONTRAST = 30.0
+
+# Subsampling step of the coarse pass that locates the box before measuring it
+_COARSE_STEP = 4
+
+
+class CameraCalibration:
+    """
+    Pixel-to-mm scale and lens model of one camera
+
+    Undistortion maps are computed once per frame size and ROI and reused for
+    every later measurement.
+    """
+
+    def __init__(self, mm_per_px: float, camera_matrix: Optional[np.ndarray] = None,
+                 dist_coeffs: Optional[np.ndarray] = None):
+        """
+        Initialize the calibration
+
+        :param mm_per_px: Millimetres per pixel on the inspection plane
+        :param camera_matrix: Optional 3x3 camera matrix
+        :param dist_coeffs: Optional distortion coefficients
+        """
+        self.mm_per_px = float(mm_per_px)
+        self.camera_matrix = camera_matrix
+        self.dist_coeffs = dist_coeffs
+        self._maps: Dict[Tuple[Tuple[int, int], Optional[Roi]], Tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def load(cls, camera_id: int) -> 'CameraCalibration':
+        """
+        Load ``camera_<id>.npz`` from the calibration directory
+
+        The file may hold ``mm_per_px``, ``camera_matrix`` and ``dist_coeffs``.
+        Cameras without a file use the default scale and no undistortion.
+
+        :param camera_id: Camera device ID
+        :return: Camera calibration
+        """
+        path = os.path.join(CALIBRATION_CONFIG['dir'], f'camera_{camera_id}.npz')
+        if not os.path.exists(path):
+            logger.warning(f"No calibration for camera {camera_id}, using default scale")
+            return cls(CALIBRATION_CONFIG['default_mm_per_px'])
+
+        with np.load(path) as data:
+            mm_per_px = float(data['mm_per_px']) if 'mm_per_px' in data \
+                else CALIBRATION_CONFIG['default_mm_per_px']
+            camera_matrix = data['camera_matrix'] if 'camera_matrix' in data else None
+            dist_coeffs = data['dist_coeffs'] if 'dist_coeffs' in data else None
+        logger.info(f"Loaded calibration for camera {camera_id} from {path}")
+        return cls(mm_per_px, camera_matrix, dist_coeffs)
+
+    def undistort_maps(self, frame_size: Tuple[int, int],
+                       roi: Optional[Roi] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Get remap tables producing the undistorted ROI directly
+
+        :param frame_size: (height, width) of the full frame
+        :param roi: Optional (x, y, w, h) region of the undistorted frame
+        :return: (map1, map2) for ``cv2.remap``, or None without a lens model
+        """
+        if self.camera_matrix is None or self.dist_coeffs is None:
+            return None
+
+        key = (frame_size, roi)
+        maps = self._maps.get(key)
+        if maps is None:
+            height, width = frame_size
+            map1, map2 = cv2.initUndistortRectifyMap(
+                self.camera_matrix, self.dist_coeffs, None, self.camera_matrix,
+                (width, height), cv2.CV_16SC2
+            )
+            if roi is not None:
+                x, y, w, h = roi
+                map1 = np.ascontiguousarray(map1[y:y + h, x:x + w])
+                map2 = np.ascontiguousarray(map2[y:y + h, x:x + w])
+            maps = self._maps[key] = (map1, map2)
+        return maps
+
+
+@functools.lru_cache(maxsize=None)
+def get_calibration(camera_id: int) -> CameraCalibration:
+    """
+    Get the calibration of a camera, loading it on first use
+
+    :param camera_id: Camera device ID
+    :return: Cached camera calibration
+    """
+    return CameraCalibration.load(camera_id)
+
+
+@dataclass(frozen=True)
+class BoxMeasurement:
+    """
+    Box dimensions averaged over a batch of frames
+    """
+    length_mm: float
+    width_mm: float
+    length_std_mm: float
+    width_std_mm: float
+    angle_deg: float
+    fill_ratio: float
+    fill_ratio_std: float
+    corners_px: np.ndarray
+    frames: int
+    elapsed_ms: float
+    budget_ms: float
+
+    @property
+    def within_budget(self) -> bool:
+        """True if the measurement finished within its latency budget"""
+        return self.elapsed_ms <= self.budget_ms
+
+
+@dataclass(frozen=True)
+class GapMeasurement:
+    """
+    Cover gap widths along the seam averaged over a batch of frames
+    """
+    mean_mm: float
+    min_mm: float
+    max_mm: float
+    frames: int
+    elapsed_ms: float
+    budget_ms: float
+    profile_mm: np.ndarray = field(repr=False)
+    detected: bool = True
+
+    @property
+    def within_budget(self) -> bool:
+        """True if the measurement finished within its latency budget"""
+        return self.elapsed_ms <= self.budget_ms
+
+
+def interval_probability(value: float, sigma: float, low: float = -math.inf,
+                         high: float = math.inf) -> float:
+    """
+    Probability that a normally distributed measurement lies within [low, high]
+
+    :param value: Measured value
+    :param sigma: Standard deviation of the measurement
+    :param low: Lower bound
+    :param high: Upper bound
+    :return: Probability between 0 and 1
+    """
+    def cdf(bound: float) -> float:
+        if math.isinf(bound):
+            return 1.0 if bound > 0 else 0.0
+        return 0.5 * (1 + math.erf((bound - value) / (sigma * math.sqrt(2))))
+
+    return max(0.0, cdf(high) - cdf(low))
+
+
+class MeasurementEngine:
+    """
+    Vectorized box and cover-gap measurements over batches of frames
+    """
+
+    @staticmethod
+    def _prepare(frames: Sequence[np.ndarray], calibration: CameraCalibration,
+                 roi: Optional[Roi]) -> np.ndarray:
+        """
+        Convert frames to an undistorted grayscale ROI stack
+
+        :param frames: BGR or grayscale frames of equal size
+        :param calibration: Camera calibration
+        :param roi: Optional (x, y, w, h) region to measure in
+        :return: Array of shape (frames, height, width)
+        """
+        if not frames:
+            raise ValueError('No frames to measure')
+
+        maps = calibration.undistort_maps(frames[0].shape[:2], roi)
+        grays: List[np.ndarray] = []
+        for frame in frames:
+            if maps is None and roi is not None:
+                # Crop before converting so only the ROI is processed
+                x, y, w, h = roi
+                frame = frame[y:y + h, x:x + w]
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+            if maps is not None:
+                gray = cv2.remap(gray, maps[0], maps[1], cv2.INTER_LINEAR)
+            grays.append(gray)
+        return np.stack(grays)
+
+    @staticmethod
+    def _split_classes(image: np.ndarray) -> Tuple[float, float]:
+        """
+        Split an image into dark and bright classes
+
+        Otsu's threshold drifts towards the smaller class when it covers only a
+        few percent of the image (e.g. a thin gap), so it is refined to the
+        midpoint of the two class means.
+
+        :param image: 2-D uint8 image, typically the frame average
+        :return: (threshold, contrast between the class means); a low contrast
+            means the image holds a single class and the split is just noise
+        """
+        threshold, _ = cv2.threshold(image, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        histogram = np.bincount(image.ravel(), minlength=256).astype(np.float64)
+        levels = np.arange(256, dtype=np.float64)
+        below = levels <= threshold
+        if histogram[below].sum() == 0 or histogram[~below].sum() == 0:
+            return threshold, 0.0
+        low_mean = histogram[below] @ levels[below] / histogram[below].sum()
+        high_mean = histogram[~below] @ levels[~below] / histogram[~below].sum()
+        return (low_mean + high_mean) / 2, high_mean - low_mean
+
+    @staticmethod
+    def _finish(kind: str, start: float, budget_ms: float) -> float:
+        """Compute the elapsed time and warn when the budget is exceeded."""
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms > budget_ms:
+            logger.warning(f"{kind} measurement took {elapsed_ms:.1f} ms (budget {budget_ms:.1f} ms)")
+        return elapsed_ms
+
+    @staticmethod
+    def measure_box(frames: Sequence[np.ndarray], calibration: CameraCalibration,
+                    roi: Optional[Roi] = None, mm_per_px: Optional[float] = None,
+                    budget_ms: float = 50.0,
+                    min_contrast: float = DEFAULT_MIN_CONTRAST) -> BoxMeasurement:
+        """
+        Measure a box seen from above against a contrasting background
+
+        A coarse pass over a subsampled frame average finds the threshold and the
+        box's bounding box; the full-resolution frames are then cropped to it.
+        The box size, orientation and corners follow from the second-order image
+        moments of each frame's mask (a filled rectangle of side L has variance
+        L^2/12 along that side), so every frame is measured with array
+        reductions only.
+
+        :param frames: Frames of the same box, averaged for the result
+        :param calibration: Camera calibration
+        :param roi: Optional (x, y, w, h) region containing the box
+        :param mm_per_px: Optional scale overriding the calibration
+        :param budget_ms: Latency budget of the measurement
+        :param min_contrast: Minimum gray-level difference between box and background
+        :return: Box measurement
+        """
+        start = time.perf_counter()
+        stack = MeasurementEngine._prepare(frames, calibration, roi)
+
+        # Coarse pass: threshold, polarity and bounding box on a subsampled average
+        step = _COARSE_STEP
+        coarse = stack[:, ::step, ::step].mean(axis=0, dtype=np.float32).astype(np.uint8)
+        threshold, contrast = MeasurementEngine._split_classes(coarse)
+        if contrast < min_contrast:
+            raise ValueError('No box found in frame')
+        coarse_mask = coarse > threshold
+
+        # The box is the class that does not cover the ROI border
+        border = np.concatenate([coarse_mask[0, :], coarse_mask[-1, :], coarse_mask[:, 0], coarse_mask[:, -1]])
+        bright_box = border.mean() <= 0.5
+        if not bright_box:
+            coarse_mask = ~coarse_mask
+
+        rows = np.flatnonzero(coarse_mask.any(axis=1))
+        cols = np.flatnonzero(coarse_mask.any(axis=0))
+        if rows.size == 0 or cols.size == 0:
+            raise ValueError('No box found in frame')
+        height, width = stack.shape[1:]
+        y0, y1 = max(0, (rows[0] - 1) * step), min(height, (rows[-1] + 2) * step)
+        x0, x1 = max(0, (cols[0] - 1) * step), min(width, (cols[-1] + 2) * step)
+
+        # Fine pass on the box's bounding box only
+        crop = stack[:, y0:y1, x0:x1]
+        masks = crop > threshold if bright_box else crop <= threshold
+
+        xs = np.arange(x0, x1, dtype=np.float64)
+        ys = np.arange(y0, y1, dtype=np.float64)
+
+        # Projections reduce every moment to 1-D dot products
+        col_sums = masks.sum(axis=1, dtype=np.float64)
+        row_sums = masks.sum(axis=2, dtype=np.float64)
+        area = col_sums.sum(axis=1)
+        if np.any(area == 0):
+            raise ValueError('No box found in frame')
+
+        cx = col_sums @ xs / area
+        cy = row_sums @ ys / area
+        mu20 = col_sums @ (xs ** 2) / area - cx ** 2
+        mu02 = row_sums @ (ys ** 2) / area - cy ** 2
+        row_x_sums = masks.view(np.uint8) @ xs.astype(np.float32)
+        mu11 = row_x_sums.astype(np.float64) @ ys / area - cx * cy
+
+        spread = np.sqrt(((mu20 - mu02) / 2) ** 2 + mu11 ** 2)
+        major = np.sqrt(12 * ((mu20 + mu02) / 2 + spread))
+        minor = np.sqrt(12 * np.maximum((mu20 + mu02) / 2 - spread, 0))
+        angle = 0.5 * np.arctan2(2 * mu11, mu20 - mu02)
+
+        # Corners of each frame's rectangle, shape (frames, 4, 2)
+        axis_major = np.stack([np.cos(angle), np.sin(angle)], axis=1) * (major / 2)[:, None]
+        axis_minor = np.stack([-np.sin(angle), np.cos(angle)], axis=1) * (minor / 2)[:, None]
+        signs = np.array([[-1, -1], [1, -1], [1, 1], [-1, 1]], dtype=np.float64)
+        centers = np.stack([cx, cy], axis=1)
+        corners = (centers[:, None, :]
+                   + signs[None, :, 0, None] * axis_major[:, None, :]
+                   + signs[None, :, 1, None] * axis_minor[:, None, :])
+        if roi is not None:
+            corners += np.array(roi[:2], dtype=np.float64)
+
+        scale = mm_per_px if mm_per_px is not None else calibration.mm_per_px
+        fill_ratio = area / np.maximum(major * minor, 1.0)
+
+        return BoxMeasurement(
+            length_mm=float(major.mean() * scale),
+            width_mm=float(minor.mean() * scale),
+            length_std_mm=float(major.std() * scale),
+            width_std_mm=float(minor.std() * scale),
+            angle_deg=float(np.degrees(angle.mean())),
+            fill_ratio=float(fill_ratio.mean()),
+            fill_ratio_std=float(fill_ratio.std()),
+            corners_px=corners.mean(axis=0),
+            frames=len(stack),
+            elapsed_ms=MeasurementEngine._finish('Box', start, budget_ms),
+            budget_ms=budget_ms
+        )
+
+    @staticmethod
+    def measure_gap(frames: Sequence[np.ndarray], calibration: CameraCalibration,
+                    roi: Optional[Roi] = None, horizontal: bool = True,
+                    threshold: Optional[float] = None, mm_per_px: Optional[float] = None,
+                    budget_ms: float = 50.0,
+                    min_contrast: float = DEFAULT_MIN_CONTRAST) -> GapMeasurement:
+        """
+        Measure the width of the dark gap between cover and box along the seam
+
+        :param frames: Frames of the same part, averaged for the result
+        :param calibration: Camera calibration
+        :param roi: Optional (x, y, w, h) region straddling the seam
+        :param horizontal: True if the seam runs left-right in the ROI
+        :param threshold: Gray level below which pixels belong to the gap;
+            derived from the averaged frames if None
+        :param mm_per_px: Optional scale overriding the calibration
+        :param budget_ms: Latency budget of the measurement
+        :param min_contrast: Minimum gray-level difference between gap and
+            surface for a derived threshold; below it the seam is closed
+        :return: Gap measurement (all widths 0 if no gap is detected)
+        """
+        start = time.perf_counter()
+        stack = MeasurementEngine._prepare(frames, calibration, roi)
+        detected = True
+        if threshold is None:
+            mean_image = stack.mean(axis=0, dtype=np.float32).astype(np.uint8)
+            threshold, contrast = MeasurementEngine._split_classes(mean_image)
+            # A closed seam is a single class; splitting it would count noise as gap
+            detected = bool(contrast >= min_contrast)
+
+        if detected:
+            # Gap width at every position along the seam, averaged over frames
+            dark = stack < threshold
+            profile = dark.sum(axis=1 if horizontal else 2, dtype=np.float64).mean(axis=0)
+        else:
+            profile = np.zeros(stack.shape[2 if horizontal else 1])
+
+        scale = mm_per_px if mm_per_px is not None else calibration.mm_per_px
+        profile_mm = profile * scale
+
+        return GapMeasurement(
+            mean_mm=float(profile_mm.mean()),
+            min_mm=float(profile_mm.min()),
+            max_mm=float(profile_mm.max()),
+            frames=len(stack),
+            elapsed_ms=MeasurementEngine._finish('Gap', start, budget_ms),
+            budget_ms=budget_ms,
+            profile_mm=profile_mm,
+            detected=detected
+        )
@@ -1,42 +1,117 @@
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
 from src.utils.logger import setup_logger
 from pyzbar.pyzbar import decode
-from src.utils.camera import GalaxyCamera
+from src.utils.camera import GalaxyCamera, CameraWaitCancelled
+from .inspection_plan import InspectionPlan
+from .cancellation import CancellationToken
+from .measurement import MeasurementEngine, DEFAULT_MIN_CONTRAST, get_calibration, interval_probability
+from .temporal_voting import StreamingVoter
 import cv2
+import threading
 import time
 import numpy as np
 
 logger = setup_logger(__name__)
 
+# One OpenCV QR detector per thread, created on first use
+_thread_local = threading.local()
+
 class TaskAnalyzer:
     """
     Comprehensive task analyzer with methods for different inspection tasks
     """
     
     @staticmethod
-    def _init_camera(camera_id: int = 1) -> Optional[cv2.VideoCapture]:
+    def _init_camera(camera_id: int = 1, profile: Optional[Dict[str, float]] = None,
+                     token: Optional[CancellationToken] = None,
+                     wait_timeout: Optional[float] = None) -> Optional[cv2.VideoCapture]:
         """
         Initialize the camera
         
+        Waits while another task holds the same device, until ``wait_timeout``
+        passes or ``token`` is cancelled.
+        
         :param camera_id: Camera device ID (default is 0 for primary camera)
-        :return: VideoCapture object or None if camera initialization fails
+        :param profile: Optional acquisition profile (camera feature -> value)
+        :param token: Optional cancellation token that stops the wait for the device
+        :param wait_timeout: Seconds to wait for a busy device, None to wait until it is free
+        :return: VideoCapture object or None if camera initialization fails or is cancelled
         """
-        camera = GalaxyCamera(device_index=camera_id)
+        try:
+            camera = GalaxyCamera(device_index=camera_id, wait_timeout=wait_timeout, cancel_token=token)
+        except CameraWaitCancelled as e:
+            logger.info(str(e))
+            return None
         if not camera.isOpened():
             return None
+        if profile:
+            try:
+                camera.apply_profile(profile)
+            except Exception as e:
+                # The device is already streaming; release it so later tasks can open it
+                logger.error(f"Failed to apply acquisition profile to camera {camera_id}: {e}")
+                camera.release()
+                return None
         return camera
+
+    @staticmethod
+    def _get_plan(task_data: Optional[Dict[str, Any]], task_name: str) -> InspectionPlan:
+        """
+        Get the precompiled inspection plan for a task
+        
+        :param task_data: Task data possibly holding a compiled 'plan'
+        :param task_name: Name of the task
+        :return: Compiled plan, or a default plan if none was supplied
+        """
+        plan = task_data.get('plan') if task_data else None
+        return plan if plan is not None else InspectionPlan.default(task_name)
+
+    @staticmethod
+    def _get_token(task_data: Optional[Dict[str, Any]]) -> CancellationToken:
+        """
+        Get the cancellation token of a task
+        
+        :param task_data: Task data possibly holding a 'cancel_token'
+        :return: Supplied token, or a token that is never cancelled
+        """
+        token = task_data.get('cancel_token') if task_data else None
+        return token if token is not None else CancellationToken()
+
+    @staticmethod
+    def _cancelled_result(task_name: str, token: CancellationToken) -> Dict[str, str]:
+        """
+        Build the result of a cancelled analysis
+        
+        :param task_name: Name of the task
+        :param token: Cancelled token
+        :return: Analysis result dictionary with CANCELLED status
+        """
+        return {
+            'task_name': task_name,
+            'status': 'CANCELLED',
+            'confidence': '0%',
+            'details': f'Analysis cancelled: {token.reason}'
+        }
     
     @staticmethod
-    def _read_qr_code(frame: np.ndarray) -> Optional[str]:
+    def _read_qr_code(frame: np.ndarray, decoder: str = 'pyzbar') -> Optional[str]:
         """
         Read QR code from a frame
         
         :param frame: Image frame from camera
+        :param decoder: 'pyzbar' or 'opencv'
         :return: Decoded QR code text or None if no QR code found
         """
         # Convert frame to grayscale for better QR code detection
         gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         
+        if decoder == 'opencv':
+            detector = getattr(_thread_local, 'qr_detector', None)
+            if detector is None:
+                detector = _thread_local.qr_detector = cv2.QRCodeDetector()
+            text, _, _ = detector.detectAndDecode(gray)
+            return text or None
+        
         # Decode QR codes in the frame
         qr_codes = decode(gray)
         
@@ -45,16 +120,167 @@ class TaskAnalyzer:
             return qr_codes[0].data.decode('utf-8')
         return None
 
+    @staticmethod
+    def _acquire_frames(camera: GalaxyCamera, count: int, timeout: float,
+                        token: CancellationToken) -> List[np.ndarray]:
+        """
+        Read consecutive frames for a batch measurement
+        
+        :param camera: Opened camera
+        :param count: Number of frames wanted
+        :param timeout: Maximum seconds to spend acquiring
+        :param token: Cancellation token checked between frames
+        :return: Acquired frames (fewer than count on timeout or cancellation)
+        """
+        frames = []
+        start_time = time.time()
+        while len(frames) < count and (time.time() - start_time) < timeout and not token.is_cancelled():
+            ret, frame = camera.read()
+            if ret:
+                frames.append(frame)
+        return frames
+
+    @staticmethod
+    def _create_voter(plan: InspectionPlan) -> StreamingVoter:
+        """
+        Create the per-task streaming voter
+        
+        Recipe parameters: VOTE_P_PASS_OK (default 0.9), VOTE_P_PASS_NG (default 0.2),
+        VOTE_ALPHA (default 0.01), VOTE_BETA (default 0.01), EWMA_ALPHA (default 0.3)
+        
+        :param plan: Inspection plan of the task
+        :return: Streaming voter
+        """
+        return StreamingVoter(
+            p_pass_ok=plan.param('VOTE_P_PASS_OK', 0.9),
+            p_pass_ng=plan.param('VOTE_P_PASS_NG', 0.2),
+            alpha=plan.param('VOTE_ALPHA', 0.01),
+            beta=plan.param('VOTE_BETA', 0.01),
+            ewma_alpha=plan.param('EWMA_ALPHA', 0.3)
+        )
+
+    @staticmethod
+    def _stream_vote(task_data: Optional[Dict[str, Any]], plan: InspectionPlan,
+                     token: CancellationToken, task_name: str,
+                     evaluate: Callable[[np.ndarray], Tuple[Optional[float], str]]) -> Dict[str, str]:
+        """
+        Evaluate frames one at a time until the streaming voter reaches a decision
+        
+        Stops early once the confidence threshold is crossed, otherwise after
+        MAX_FRAMES (default 30) frames or the plan timeout. Frames without
+        evidence (score None) count towards MAX_FRAMES but not towards the vote.
+        
+        :param task_data: Task data, used for evidence recording
+        :param plan: Inspection plan of the task
+        :param token: Cancellation token checked between frames
+        :param task_name: Name of the task
+        :param evaluate: Maps a frame to (probability the frame passes, note);
+            a None probability means the frame holds no evidence
+        :return: Analysis result dictionary
+        """
+        result = {
+            'task_name': task_name,
+            'status': 'NG',
+            'confidence': '0%',
+            'details': 'Inspection not started'
+        }
+        
+        # Validate the recipe before the camera is opened, so a bad value can't leave it streaming
+        try:
+            voter = TaskAnalyzer._create_voter(plan)
+            max_frames = plan.param('MAX_FRAMES', 30, int)
+        except (ValueError, TypeError) as e:
+            result['status'] = 'ERROR'
+            result['details'] = f'Invalid voting parameters in recipe: {str(e)}'
+            return result
+        
+        camera = TaskAnalyzer._init_camera(plan.camera_id, plan.acquisition, token, plan.timeout)
+        if not camera:
+            if token.is_cancelled():
+                return TaskAnalyzer._cancelled_result(task_name, token)
+            result['details'] = f'Failed to initialize camera {plan.camera_id}'
+            return result
+        
+        frames_seen = 0
+        last_frame = None
+        note = ''
+        try:
+            start_time = time.time()
+            while (frames_seen < max_frames and (time.time() - start_time) < plan.timeout
+                   and not token.is_cancelled()):
+                ret, frame = camera.read()
+                if not ret:
+                    continue
+                frames_seen += 1
+                score, frame_note = evaluate(frame)
+                if score is None:
+                    # Keep the last note with evidence for the result details
+                    note = note or frame_note
+                    continue
+                last_frame = frame
+                note = frame_note
+                if voter.update(score):
+                    break
+            
+            if voter.decision is None and token.is_cancelled():
+                result = TaskAnalyzer._cancelled_result(task_name, token)
+            elif frames_seen == 0:
+                result['details'] = 'No frames acquired within timeout period'
+            elif voter.frames == 0:
+                result['details'] = f'{note} in {frames_seen} frames'
+            else:
+                decided_early = voter.decision is not None
+                result['status'] = voter.finalize()
+                result['confidence'] = f'{voter.confidence * 100:.1f}%'
+                result['details'] = (
+                    f'{note}; {voter.summary()} of {frames_seen} frames read, '
+                    f'{"decided early" if decided_early else "no early decision"}'
+                )
+        
+        except Exception as e:
+            # A failed measurement or decode is not a part rejection
+            result['status'] = 'ERROR'
+            result['confidence'] = '0%'
+            result['details'] = f'Error during {task_name} inspection: {str(e)}'
+        
+        finally:
+            camera.release()
+        
+        if result['status'] in ('OK', 'NG'):
+            TaskAnalyzer._record_evidence(task_data, last_frame, task_name, voter.frames, result['status'])
+        return result
+
+    @staticmethod
+    def _record_evidence(task_data: Optional[Dict[str, Any]], frame: Optional[np.ndarray],
+                         task_name: str, frame_seq: int, status: str):
+        """
+        Hand the frame that produced a result to the evidence recorder, if any
+        
+        :param task_data: Task data possibly holding an 'evidence' recorder
+        :param frame: Frame that produced the result
+        :param task_name: Name of the task
+        :param frame_seq: Sequence number of the frame within the task
+        :param status: Result status (OK/NG)
+        """
+        recorder = task_data.get('evidence') if task_data else None
+        if recorder is None or frame is None:
+            return
+        order_no = task_data.get('order_data', {}).get('ORDER_NO', 'UNKNOWN')
+        recorder.submit(frame, order_no, task_name, frame_seq, status)
+
     @staticmethod
     def case_task_analysis(task_data: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
         """
         Analysis for case task - reads QR code from camera
 
+        :param task_data: Optional task data holding the compiled inspection 'plan'
+            and the 'cancel_token'
         :return: Analysis result dictionary
         """
-        # Extract parameters from task_data
-        camera_id = task_data.get('camera_id', 1) if task_data else 1
-        timeout = task_data.get('timeout', 30) if task_data else 30
+        plan = TaskAnalyzer._get_plan(task_data, 'case_task')
+        token = TaskAnalyzer._get_token(task_data)
+        if token.is_cancelled():
+            return TaskAnalyzer._cancelled_result('case_task', token)
         
         # Initialize result dictionary
         result = {
@@ -65,32 +291,46 @@ class TaskAnalyzer:
         }
         
         # Initialize camera
-        camera = TaskAnalyzer._init_camera(camera_id)
+        camera = TaskAnalyzer._init_camera(plan.camera_id, plan.acquisition, token, plan.timeout)
         if not camera:
-            result['details'] = f'Failed to initialize camera {camera_id}'
+            if token.is_cancelled():
+                return TaskAnalyzer._cancelled_result('case_task', token)
+            result['details'] = f'Failed to initialize camera {plan.camera_id}'
             return result
         
+        last_frame = None
+        frame_seq = 0
+        mismatched_text = None
         try:
             start_time = time.time()
-            while (time.time() - start_time) < timeout:
+            while (time.time() - start_time) < plan.timeout and not token.is_cancelled():
                 # Read frame from camera
                 ret, frame = camera.read()
                 if not ret:
                     continue
+                last_frame = frame
+                frame_seq += 1
                 
                 # Try to read QR code
-                qr_text = TaskAnalyzer._read_qr_code(frame)
-                if qr_text:
+                qr_text = TaskAnalyzer._read_qr_code(plan.crop(frame), plan.decoder)
+                if qr_text and plan.matches(qr_text):
                     result['status'] = 'OK'
                     result['confidence'] = '95%'
                     result['details'] = f'QR Code detected: {qr_text}'
                     break
+                if qr_text:
+                    mismatched_text = qr_text
                 
-                # Small delay to prevent excessive CPU usage
-                time.sleep(0.1)
+                # Small delay to prevent excessive CPU usage, cut short on cancellation
+                token.wait(0.1)
             
-            if result['status'] == 'NG':
-                result['details'] = 'No QR code detected within timeout period'
+            if result['status'] == 'NG' and token.is_cancelled():
+                result = TaskAnalyzer._cancelled_result('case_task', token)
+            elif result['status'] == 'NG':
+                if mismatched_text:
+                    result['details'] = f'QR code {mismatched_text} does not match expected pattern'
+                else:
+                    result['details'] = 'No QR code detected within timeout period'
                 
         except Exception as e:
             result['details'] = f'Error during QR code detection: {str(e)}'
@@ -99,72 +339,290 @@ class TaskAnalyzer:
             # Always release the camera
             camera.release()
         
+        if result['status'] != 'CANCELLED':
+            TaskAnalyzer._record_evidence(task_data, last_frame, 'case_task', frame_seq, result['status'])
         return result
 
     @staticmethod
     def box_task_analysis(task_data: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
         """
-        Analysis for box task
+        Analysis for box task - measures box length and width against the recipe
+        
+        Recipe parameters: BOX_LENGTH_MM, BOX_WIDTH_MM, BOX_TOLERANCE_MM (default 2),
+        MIN_FILL_RATIO (default 0.9), MIN_CONTRAST (default 30), FRAMES (default 3),
+        MM_PER_PX, BUDGET_MS (default 50)
         
-        :param task_data: Optional task-specific data
+        :param task_data: Optional task data holding the compiled inspection 'plan'
+            and the 'cancel_token'
         :return: Analysis result
         """
-        # Placeholder for box task specific analysis
-        # TODO: Implement actual box task analysis logic
-        return {
+        plan = TaskAnalyzer._get_plan(task_data, 'box_task')
+        token = TaskAnalyzer._get_token(task_data)
+        if token.is_cancelled():
+            return TaskAnalyzer._cancelled_result('box_task', token)
+        
+        result = {
             'task_name': 'box_task',
-            'status': 'OK',  # or 'NG'
-            'confidence': '92%',
-            'details': 'Box inspection and measurement completed'
+            'status': 'NG',
+            'confidence': '0%',
+            'details': 'Box measurement not started'
         }
+        
+        expected_length = plan.param('BOX_LENGTH_MM')
+        expected_width = plan.param('BOX_WIDTH_MM')
+        if expected_length is None or expected_width is None:
+            result['status'] = 'ERROR'
+            result['details'] = 'Recipe has no BOX_LENGTH_MM/BOX_WIDTH_MM'
+            return result
+        tolerance = plan.param('BOX_TOLERANCE_MM', 2.0)
+        min_fill_ratio = plan.param('MIN_FILL_RATIO', 0.9)
+        
+        camera = TaskAnalyzer._init_camera(plan.camera_id, plan.acquisition, token, plan.timeout)
+        if not camera:
+            if token.is_cancelled():
+                return TaskAnalyzer._cancelled_result('box_task', token)
+            result['details'] = f'Failed to initialize camera {plan.camera_id}'
+            return result
+        
+        frames = []
+        try:
+            frames = TaskAnalyzer._acquire_frames(camera, plan.param('FRAMES', 3, int), plan.timeout, token)
+            if token.is_cancelled():
+                result = TaskAnalyzer._cancelled_result('box_task', token)
+            elif not frames:
+                result['details'] = 'No frames acquired within timeout period'
+            else:
+                calibration = get_calibration(plan.camera_id)
+                mm_per_px = plan.param('MM_PER_PX', calibration.mm_per_px)
+                measurement = MeasurementEngine.measure_box(
+                    frames, calibration, plan.roi, mm_per_px, plan.param('BUDGET_MS', 50.0),
+                    plan.param('MIN_CONTRAST', DEFAULT_MIN_CONTRAST)
+                )
+                
+                # Uncertainty of the frame average, at least half a pixel (or 0.5% fill)
+                sqrt_frames = np.sqrt(len(frames))
+                length_sigma = max(measurement.length_std_mm / sqrt_frames, mm_per_px / 2)
+                width_sigma = max(measurement.width_std_mm / sqrt_frames, mm_per_px / 2)
+                fill_sigma = max(measurement.fill_ratio_std / sqrt_frames, 0.005)
+                p_within = (
+                    interval_probability(measurement.length_mm, length_sigma,
+                                         expected_length - tolerance, expected_length + tolerance)
+                    * interval_probability(measurement.width_mm, width_sigma,
+                                           expected_width - tolerance, expected_width + tolerance)
+                    * interval_probability(measurement.fill_ratio, fill_sigma, low=min_fill_ratio)
+                )
+                
+                failures = []
+                if abs(measurement.length_mm - expected_length) > tolerance:
+                    failures.append('length out of tolerance')
+                if abs(measurement.width_mm - expected_width) > tolerance:
+                    failures.append('width out of tolerance')
+                if measurement.fill_ratio < min_fill_ratio:
+                    failures.append(f'fill ratio below {min_fill_ratio:.2f} (damaged or open box)')
+                result['status'] = 'NG' if failures else 'OK'
+                confidence = 1 - p_within if failures else p_within
+                result['confidence'] = f'{confidence * 100:.1f}%'
+                result['details'] = (
+                    (f'{"; ".join(failures)}: ' if failures else '')
+                    + f'Box {measurement.length_mm:.1f} x {measurement.width_mm:.1f} mm '
+                    f'(expected {expected_length:.1f} x {expected_width:.1f} +/- {tolerance:.1f} mm), '
+                    f'fill {measurement.fill_ratio:.2f}, {len(frames)} frames, '
+                    f'{measurement.elapsed_ms:.1f} ms'
+                )
+        
+        except Exception as e:
+            result['details'] = f'Error during box measurement: {str(e)}'
+        
+        finally:
+            camera.release()
+        
+        if result['status'] in ('OK', 'NG') and frames:
+            TaskAnalyzer._record_evidence(task_data, frames[-1], 'box_task', len(frames), result['status'])
+        return result
 
     @staticmethod
     def cover_task_analysis(task_data: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
         """
-        Analysis for cover task
+        Analysis for cover task - measures the gap between cover and box along the seam
+        
+        Recipe parameters: GAP_MAX_MM, GAP_MIN_MM (default 0), GAP_AXIS ('horizontal'
+        or 'vertical' seam, default horizontal), GAP_THRESHOLD (gray level, default derived
+        from the frames), MIN_CONTRAST (default 30; below it the seam counts as closed),
+        FRAMES (default 3), MM_PER_PX, BUDGET_MS (default 50)
         
-        :param task_data: Optional task-specific data
+        :param task_data: Optional task data holding the compiled inspection 'plan'
+            and the 'cancel_token'
         :return: Analysis result
         """
-        # Placeholder for cover task specific analysis
-        # TODO: Implement actual cover task analysis logic
-        return {
+        plan = TaskAnalyzer._get_plan(task_data, 'cover_task')
+        token = TaskAnalyzer._get_token(task_data)
+        if token.is_cancelled():
+            return TaskAnalyzer._cancelled_result('cover_task', token)
+        
+        result = {
             'task_name': 'cover_task',
-            'status': 'OK',  # or 'NG'
-            'confidence': '93%',
-            'details': 'Cover inspection and fitting analysis completed'
+            'status': 'NG',
+            'confidence': '0%',
+            'details': 'Cover gap measurement not started'
         }
+        
+        gap_max = plan.param('GAP_MAX_MM')
+        if gap_max is None:
+            result['status'] = 'ERROR'
+            result['details'] = 'Recipe has no GAP_MAX_MM'
+            return result
+        gap_min = plan.param('GAP_MIN_MM', 0.0)
+        horizontal = plan.param('GAP_AXIS', 'horizontal', str).lower() != 'vertical'
+        
+        camera = TaskAnalyzer._init_camera(plan.camera_id, plan.acquisition, token, plan.timeout)
+        if not camera:
+            if token.is_cancelled():
+                return TaskAnalyzer._cancelled_result('cover_task', token)
+            result['details'] = f'Failed to initialize camera {plan.camera_id}'
+            return result
+        
+        frames = []
+        try:
+            frames = TaskAnalyzer._acquire_frames(camera, plan.param('FRAMES', 3, int), plan.timeout, token)
+            if token.is_cancelled():
+                result = TaskAnalyzer._cancelled_result('cover_task', token)
+            elif not frames:
+                result['details'] = 'No frames acquired within timeout period'
+            else:
+                calibration = get_calibration(plan.camera_id)
+                mm_per_px = plan.param('MM_PER_PX', calibration.mm_per_px)
+                measurement = MeasurementEngine.measure_gap(
+                    frames, calibration, plan.roi, horizontal, plan.param('GAP_THRESHOLD'),
+                    mm_per_px, plan.param('BUDGET_MS', 50.0),
+                    plan.param('MIN_CONTRAST', DEFAULT_MIN_CONTRAST)
+                )
+                
+                # Pixel quantization of the frame-averaged gap widths
+                sigma = mm_per_px / (2 * np.sqrt(len(frames)))
+                # Widths can't be negative, so a zero lower bound is always met
+                p_within = interval_probability(measurement.max_mm, sigma, high=gap_max)
+                if gap_min > 0:
+                    p_within *= interval_probability(measurement.min_mm, sigma, low=gap_min)
+                
+                within = gap_min <= measurement.min_mm and measurement.max_mm <= gap_max
+                result['status'] = 'OK' if within else 'NG'
+                confidence = p_within if within else 1 - p_within
+                result['confidence'] = f'{confidence * 100:.1f}%'
+                result['details'] = (
+                    (f'Cover gap {measurement.min_mm:.2f}-{measurement.max_mm:.2f} mm '
+                     f'(mean {measurement.mean_mm:.2f}, ' if measurement.detected
+                     else 'No cover gap detected (') +
+                    f'allowed {gap_min:.2f}-{gap_max:.2f} mm), '
+                    f'{len(frames)} frames, {measurement.elapsed_ms:.1f} ms'
+                )
+        
+        except Exception as e:
+            result['details'] = f'Error during cover gap measurement: {str(e)}'
+        
+        finally:
+            camera.release()
+        
+        if result['status'] in ('OK', 'NG') and frames:
+            TaskAnalyzer._record_evidence(task_data, frames[-1], 'cover_task', len(frames), result['status'])
+        return result
 
     @staticmethod
     def folding_task_analysis(task_data: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
         """
-        Analysis for folding task
+        Analysis for folding task - checks the seam between folded flaps frame by frame
         
-        :param task_data: Optional task-specific data
+        Recipe parameters: FOLD_GAP_MAX_MM, GAP_AXIS, GAP_THRESHOLD, MIN_CONTRAST, MM_PER_PX,
+        BUDGET_MS and the voting parameters of :meth:`_create_voter`
+        
+        :param task_data: Optional task data holding the compiled inspection 'plan'
+            and the 'cancel_token'
         :return: Analysis result
         """
-        # Placeholder for folding task specific analysis
-        # TODO: Implement actual folding task analysis logic
-        return {
-            'task_name': 'folding_task',
-            'status': 'OK',  # or 'NG'
-            'confidence': '94%',
-            'details': 'Folding precision and quality inspection completed'
-        }
+        plan = TaskAnalyzer._get_plan(task_data, 'folding_task')
+        token = TaskAnalyzer._get_token(task_data)
+        if token.is_cancelled():
+            return TaskAnalyzer._cancelled_result('folding_task', token)
+        
+        gap_max = plan.param('FOLD_GAP_MAX_MM')
+        if gap_max is None:
+            return {
+                'task_name': 'folding_task',
+                'status': 'ERROR',
+                'confidence': '0%',
+                'details': 'Recipe has no FOLD_GAP_MAX_MM'
+            }
+        
+        calibration = get_calibration(plan.camera_id)
+        mm_per_px = plan.param('MM_PER_PX', calibration.mm_per_px)
+        horizontal = plan.param('GAP_AXIS', 'horizontal', str).lower() != 'vertical'
+        threshold = plan.param('GAP_THRESHOLD')
+        budget_ms = plan.param('BUDGET_MS', 50.0)
+        min_contrast = plan.param('MIN_CONTRAST', DEFAULT_MIN_CONTRAST)
+        
+        def evaluate(frame: np.ndarray) -> Tuple[Optional[float], str]:
+            # A closed fold has no gap class and measures 0 mm
+            measurement = MeasurementEngine.measure_gap(
+                [frame], calibration, plan.roi, horizontal, threshold, mm_per_px, budget_ms,
+                min_contrast
+            )
+            score = interval_probability(measurement.max_mm, mm_per_px / 2, high=gap_max)
+            if not measurement.detected:
+                return score, f'fold closed (max {gap_max:.2f} mm)'
+            return score, f'fold gap up to {measurement.max_mm:.2f} mm (max {gap_max:.2f} mm)'
+        
+        return TaskAnalyzer._stream_vote(task_data, plan, token, 'folding_task', evaluate)
 
     @staticmethod
     def final_check_task_analysis(task_data: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
         """
-        Final comprehensive task analysis
+        Final comprehensive task analysis - QR payload and, if the recipe sets
+        BOX_LENGTH_MM/BOX_WIDTH_MM, box dimensions, checked frame by frame
+        
+        Recipe parameters: BOX_LENGTH_MM, BOX_WIDTH_MM, BOX_TOLERANCE_MM, MIN_CONTRAST,
+        MM_PER_PX, BUDGET_MS and the voting parameters of :meth:`_create_voter`
         
-        :param task_data: Optional task-specific data
+        :param task_data: Optional task data holding the compiled inspection 'plan'
+            and the 'cancel_token'
         :return: Final analysis result
         """
-        # Placeholder for final comprehensive check
-        # TODO: Implement actual final check logic
-        return {
-            'task_name': 'final_check_task',
-            'status': 'OK',  # or 'NG'
-            'confidence': '96%',
-            'details': 'Comprehensive final inspection completed'
-        }
+        plan = TaskAnalyzer._get_plan(task_data, 'final_check_task')
+        token = TaskAnalyzer._get_token(task_data)
+        if token.is_cancelled():
+            return TaskAnalyzer._cancelled_result('final_check_task', token)
+        
+        calibration = get_calibration(plan.camera_id)
+        mm_per_px = plan.param('MM_PER_PX', calibration.mm_per_px)
+        expected_length = plan.param('BOX_LENGTH_MM')
+        expected_width = plan.param('BOX_WIDTH_MM')
+        check_box = expected_length is not None and expected_width is not None
+        tolerance = plan.param('BOX_TOLERANCE_MM', 2.0)
+        budget_ms = plan.param('BUDGET_MS', 50.0)
+        min_contrast = plan.param('MIN_CONTRAST', DEFAULT_MIN_CONTRAST)
+        
+        def evaluate(frame: np.ndarray) -> Tuple[Optional[float], str]:
+            payload = TaskAnalyzer._read_qr_code(plan.crop(frame), plan.decoder)
+            if not payload:
+                # Part still entering the view or a blurred frame: no evidence either way
+                return None, 'No QR code detected'
+            if not plan.matches(payload):
+                return 0.0, f'QR code {payload} does not match expected pattern'
+            if not check_box:
+                return 1.0, f'QR code {payload}'
+            
+            try:
+                measurement = MeasurementEngine.measure_box(
+                    [frame], calibration, plan.roi, mm_per_px, budget_ms, min_contrast
+                )
+            except ValueError:
+                return 0.0, f'QR code {payload}, no box found'
+            sigma = mm_per_px / 2
+            score = (
+                interval_probability(measurement.length_mm, sigma,
+                                     expected_length - tolerance, expected_length + tolerance)
+                * interval_probability(measurement.width_mm, sigma,
+                                       expected_width - tolerance, expected_width + tolerance)
+            )
+            return score, (f'QR code {payload}, box {measurement.length_mm:.1f} x '
+                           f'{measurement.width_mm:.1f} mm')
+        
+        return TaskAnalyzer._stream_vote(task_data, plan, token, 'final_check_task', evaluate)
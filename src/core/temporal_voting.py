@@ -0,0 +1,101 @@
+import math
+from typing import Optional
+
+
+class StreamingVoter:
+    """
+    Incremental OK/NG decision over a stream of per-frame evidence
+
+    Keeps O(1) state per task: vote counts, an EWMA of the per-frame scores and
+    the log-likelihood ratio of a sequential probability ratio test (SPRT), which
+    decides as soon as the evidence crosses the error-rate thresholds. An early
+    decision is only accepted while the EWMA agrees with it, so a part whose
+    recent frames contradict the accumulated evidence keeps being observed.
+    """
+
+    def __init__(self, p_pass_ok: float = 0.9, p_pass_ng: float = 0.2,
+                 alpha: float = 0.01, beta: float = 0.01, ewma_alpha: float = 0.3):
+        """
+        Initialize the voter
+
+        :param p_pass_ok: Probability that a frame of a good part passes
+        :param p_pass_ng: Probability that a frame of a bad part passes
+        :param alpha: Accepted rate of passing a bad part
+        :param beta: Accepted rate of rejecting a good part
+        :param ewma_alpha: Weight of the newest score in the EWMA used as the
+            stability gate of early decisions
+        """
+        if not 0 < p_pass_ng < p_pass_ok < 1:
+            raise ValueError('Expected 0 < p_pass_ng < p_pass_ok < 1')
+        if not (0 < alpha < 1 and 0 < beta < 1):
+            raise ValueError('Error rates must be between 0 and 1')
+
+        self.p_pass_ok = p_pass_ok
+        self.p_pass_ng = p_pass_ng
+        self.ewma_alpha = ewma_alpha
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+
+        self.frames = 0
+        self.ok_votes = 0
+        self.ng_votes = 0
+        self.ewma: Optional[float] = None
+        self.llr = 0.0
+        self.decision: Optional[str] = None
+
+    def update(self, score: float) -> Optional[str]:
+        """
+        Add the evidence of one frame
+
+        :param score: Probability (0-1) that the frame passes; 1/0 for hard votes
+        :return: 'OK' or 'NG' once decided, otherwise None
+        """
+        score = min(1.0, max(0.0, float(score)))
+        self.frames += 1
+        if score >= 0.5:
+            self.ok_votes += 1
+        else:
+            self.ng_votes += 1
+        self.ewma = score if self.ewma is None else \
+            self.ewma_alpha * score + (1 - self.ewma_alpha) * self.ewma
+
+        # Likelihood of the observation under each hypothesis, mixing pass and fail
+        likelihood_ok = score * self.p_pass_ok + (1 - score) * (1 - self.p_pass_ok)
+        likelihood_ng = score * self.p_pass_ng + (1 - score) * (1 - self.p_pass_ng)
+        self.llr += math.log(likelihood_ok / likelihood_ng)
+
+        # Stability gate: the recent frames must lean the same way as the SPRT
+        if self.decision is None:
+            if self.llr >= self.upper and self.ewma >= 0.5:
+                self.decision = 'OK'
+            elif self.llr <= self.lower and self.ewma < 0.5:
+                self.decision = 'NG'
+        return self.decision
+
+    def finalize(self) -> str:
+        """
+        Decide with the evidence so far, e.g. when the frame window is exhausted
+
+        :return: 'OK' or 'NG'
+        """
+        if self.decision is None:
+            self.decision = 'OK' if self.llr > 0 else 'NG'
+        return self.decision
+
+    @property
+    def confidence(self) -> float:
+        """Posterior probability (equal priors) of the current or leading decision"""
+        # Clamp so exp() cannot overflow on very long streams
+        p_ok = 1 / (1 + math.exp(-min(max(self.llr, -700.0), 700.0)))
+        leading = self.decision or ('OK' if self.llr > 0 else 'NG')
+        return p_ok if leading == 'OK' else 1 - p_ok
+
+    def summary(self) -> str:
+        """
+        Describe the accumulated evidence
+
+        :return: Human readable summary
+        """
+        ewma = f'{self.ewma:.2f}' if self.ewma is not None else 'n/a'
+        return (f'{self.frames} frames ({self.ok_votes} pass / {self.ng_votes} fail), '
+                f'EWMA score {ewma}')
@@ -2,22 +2,64 @@ import gxipy as gx
 from gxipy.gxidef import GxPixelFormatEntry, DxValidBit
 import numpy as np
 import cv2
+import threading
+import time
 from ctypes import *
 
+# One lock per device index: a device can only be opened once, so a task that
+# preempts another on the same camera waits until the old one releases it
+_device_locks = {}
+_device_locks_guard = threading.Lock()
+
+# Seconds between cancellation checks while waiting for a busy device
+_LOCK_WAIT_SLICE = 0.05
+
+
+class CameraWaitCancelled(RuntimeError):
+    """Raised when the wait for a busy camera is cancelled."""
+
+
+def _get_device_lock(device_index):
+    """Get the lock serializing access to a camera device."""
+    with _device_locks_guard:
+        return _device_locks.setdefault(device_index, threading.Lock())
+
+
 class GalaxyCamera:
-    def __init__(self, device_index=1):
+    def __init__(self, device_index=1, wait_timeout=None, cancel_token=None):
         """Initialize the Galaxy camera controller.
         
         Args:
             device_index (int): Index of the camera device (default: 1)
+            wait_timeout (float): Seconds to wait for another user of the
+                device to release it (default: None, wait until it is free)
+            cancel_token: Optional cancellation token; the wait for a busy
+                device stops as soon as it is cancelled
         """
         self.device_index = device_index
         self.device_manager = None
         self.camera = None
         self.image_convert = None
         self.is_opened = False
+        self._device_lock = _get_device_lock(device_index)
+        self._lock_held = False
+        self._acquire_device(wait_timeout, cancel_token)
+        self._lock_held = True
         self._initialize_camera()
 
+    def _acquire_device(self, wait_timeout, cancel_token):
+        """Wait for the device lock in short slices so cancellation is noticed."""
+        deadline = None if wait_timeout is None else time.monotonic() + wait_timeout
+        while not self._device_lock.acquire(blocking=False):
+            if deadline is not None and time.monotonic() >= deadline:
+                raise RuntimeError(f"Camera {self.device_index} is busy")
+            if cancel_token is None:
+                time.sleep(_LOCK_WAIT_SLICE)
+            elif cancel_token.wait(_LOCK_WAIT_SLICE):
+                raise CameraWaitCancelled(
+                    f"Wait for camera {self.device_index} cancelled: {cancel_token.reason}"
+                )
+
     def _initialize_camera(self):
         """Initialize camera and related objects."""
         try:
@@ -49,6 +91,16 @@ class GalaxyCamera:
             self.release()
             raise RuntimeError(f"Failed to initialize camera: {str(e)}")
 
+    def apply_profile(self, profile):
+        """Apply an acquisition profile to the camera.
+        
+        Args:
+            profile (dict): Float feature names mapped to values,
+                e.g. {'ExposureTime': 10000.0, 'Gain': 6.0}
+        """
+        for feature_name, value in profile.items():
+            self.remote_device.get_float_feature(feature_name).set(float(value))
+
     def _is_gray(self, pixel_format):
         """Check if the pixel format is grayscale."""
         gray_formats = [
@@ -140,9 +192,14 @@ class GalaxyCamera:
 
     def release(self):
         """Release the camera resources."""
-        if self.camera:
-            self.camera.stream_off()
-            self.camera.close_device()
-        self.camera = None
-        self.device_manager = None
-        self.is_opened = False
\ No newline at end of file
+        try:
+            if self.camera:
+                self.camera.stream_off()
+                self.camera.close_device()
+        finally:
+            self.camera = None
+            self.device_manager = None
+            self.is_opened = False
+            if self._lock_held:
+                self._lock_held = False
+                self._device_lock.release()
\ No newline at end of file
@@ -0,0 +1,252 @@
+import io
+import itertools
+import os
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Sentinel used to stop writer threads
+_STOP = object()
+
+_UNSAFE_CHARS = re.compile(r'[^A-Za-z0-9._-]+')
+
+
+class EvidenceRecorder:
+    """
+    Asynchronous sink for the frames that produced inspection results.
+
+    Analyzers hand frames over with :meth:`submit`, which never blocks: when the
+    queue is full the frame is dropped and counted. A small pool of writer
+    threads encodes and writes the frames and keeps the output directory under
+    a total disk budget by deleting the oldest files first.
+    """
+
+    SUPPORTED_FORMATS = ('jpg', 'png', 'npy')
+
+    def __init__(self, output_dir: str = 'evidence', image_format: str = 'jpg',
+                 max_bytes: int = 1024 * 1024 * 1024, queue_size: int = 32,
+                 workers: int = 2, jpeg_quality: int = 90,
+                 initializer: Optional[Callable[[], None]] = None):
+        """
+        Initialize the evidence recorder and start its writer threads
+
+        :param output_dir: Directory where evidence files are written
+        :param image_format: One of 'jpg', 'png' or 'npy' (raw array)
+        :param max_bytes: Total disk budget for the output directory
+        :param queue_size: Maximum number of frames waiting to be written
+        :param workers: Number of writer threads
+        :param jpeg_quality: JPEG quality (0-100) used for 'jpg' output
+        :param initializer: Optional callable run at the start of each writer thread
+        """
+        image_format = image_format.lower().lstrip('.')
+        if image_format == 'jpeg':
+            image_format = 'jpg'
+        if image_format not in self.SUPPORTED_FORMATS:
+            raise ValueError(f"Unsupported evidence format: {image_format}")
+
+        self.output_dir = output_dir
+        self.image_format = image_format
+        self.max_bytes = max_bytes
+        self.jpeg_quality = jpeg_quality
+        self.initializer = initializer
+
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        # Guards the file accounting; never held while touching the filesystem
+        self._lock = threading.Lock()
+        # Path -> size of the files on disk, oldest first
+        self._files: OrderedDict = OrderedDict()
+        self._total_bytes = 0
+        # next() on a count is atomic, so submit() needs no lock for it
+        self._sequence = itertools.count(1)
+        self._counter_lock = threading.Lock()
+        self._counters = {'submitted': 0, 'written': 0, 'dropped': 0,
+                          'evicted': 0, 'failed': 0}
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._load_existing_files()
+
+        self._workers = []
+        for index in range(max(1, workers)):
+            worker = threading.Thread(
+                target=self._worker_loop,
+                name=f'evidence-writer-{index}',
+                daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _load_existing_files(self):
+        """Account for files left over from previous runs, oldest first."""
+        entries = []
+        for entry in os.scandir(self.output_dir):
+            if entry.is_file() and not entry.name.endswith('.tmp'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+
+        for _, path, size in sorted(entries):
+            self._files[path] = size
+            self._total_bytes += size
+
+        with self._lock:
+            victims = self._evict_locked()
+        self._remove_files(victims)
+
+    def _count(self, counter: str):
+        """Increment one of the recorder counters."""
+        with self._counter_lock:
+            self._counters[counter] += 1
+
+    def submit(self, frame: np.ndarray, order_no: str, task_name: str,
+               frame_seq: int, status: str = '') -> bool:
+        """
+        Queue a frame for writing without blocking the caller
+
+        The recorder keeps a reference to ``frame``; the caller must not modify
+        it in place afterwards.
+
+        :param frame: Image frame from camera
+        :param order_no: Order number the frame belongs to
+        :param task_name: Name of the task that inspected the frame
+        :param frame_seq: Sequence number of the frame within the task
+        :param status: Optional result status appended to the file name
+        :return: True if queued, False if the frame was dropped
+        """
+        if frame is None:
+            return False
+
+        sequence = next(self._sequence)
+
+        # Timestamp and recorder-wide sequence keep names unique across parts
+        # of the same order, whose per-task frame sequences restart every time
+        parts = [time.strftime('%Y%m%d-%H%M%S'), f'{sequence:08d}', order_no or 'UNKNOWN',
+                 task_name, f'{frame_seq:06d}']
+        if status:
+            parts.append(status)
+        basename = '_'.join(_UNSAFE_CHARS.sub('-', str(part)) for part in parts)
+
+        try:
+            self._queue.put_nowait((frame, basename))
+        except queue.Full:
+            self._count('dropped')
+            return False
+
+        self._count('submitted')
+        return True
+
+    def _encode(self, frame: np.ndarray) -> bytes:
+        """Encode a frame in the configured format."""
+        if self.image_format == 'npy':
+            buffer = io.BytesIO()
+            np.save(buffer, frame, allow_pickle=False)
+            return buffer.getvalue()
+
+        params = []
+        if self.image_format == 'jpg':
+            params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        ok, encoded = cv2.imencode(f'.{self.image_format}', frame, params)
+        if not ok:
+            raise RuntimeError('Image encoding failed')
+        return encoded.tobytes()
+
+    def _write(self, frame: np.ndarray, basename: str):
+        """Encode a frame, write it atomically and enforce the disk budget."""
+        data = self._encode(frame)
+        path = os.path.join(self.output_dir, f'{basename}.{self.image_format}')
+        tmp_path = f'{path}.tmp'
+
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            # An overwritten file must not be accounted for twice
+            previous_size = self._files.pop(path, None)
+            if previous_size is not None:
+                self._total_bytes -= previous_size
+            self._files[path] = len(data)
+            self._total_bytes += len(data)
+            victims = self._evict_locked()
+        self._count('written')
+        self._remove_files(victims)
+
+    def _evict_locked(self) -> List[str]:
+        """
+        Drop the oldest files from the accounting until the directory fits the budget
+
+        Must be called with the lock held; the returned files are deleted by
+        :meth:`_remove_files` after the lock is released.
+
+        :return: Paths of the evicted files
+        """
+        victims = []
+        # Always keep the newest file, even if it alone exceeds the budget
+        while self._total_bytes > self.max_bytes and len(self._files) > 1:
+            path, size = self._files.popitem(last=False)
+            self._total_bytes -= size
+            victims.append(path)
+        return victims
+
+    def _remove_files(self, paths: List[str]):
+        """Delete evicted files (lock not held)."""
+        for path in paths:
+            try:
+                os.remove(path)
+                self._count('evicted')
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to evict evidence file {path}: {e}")
+
+    def _worker_loop(self):
+        """Writer thread main loop."""
+        if self.initializer is not None:
+            self.initializer()
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                frame, basename = item
+                self._write(frame, basename)
+            except Exception as e:
+                self._count('failed')
+                logger.error(f"Failed to write evidence frame: {e}")
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get recorder counters
+
+        :return: Dictionary with submitted/written/dropped/evicted/failed counts,
+                 current disk usage and queue depth
+        """
+        with self._counter_lock:
+            stats = dict(self._counters)
+        with self._lock:
+            stats['bytes'] = self._total_bytes
+            stats['files'] = len(self._files)
+        stats['queued'] = self._queue.qsize()
+        return stats
+
+    def close(self, timeout: Optional[float] = 5.0):
+        """
+        Flush pending frames and stop the writer threads
+
+        :param timeout: Maximum seconds to wait for each writer thread
+        """
+        for _ in self._workers:
+            self._queue.put(_STOP)
+        for worker in self._workers:
+            worker.join(timeout)
+        logger.info(f"Evidence recorder stopped: {self.stats()}")
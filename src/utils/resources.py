@@ -0,0 +1,117 @@
+import os
+import threading
+from typing import Dict, Optional, Set
+
+import cv2
+
+from src.config.settings import RESOURCE_CONFIG, TASK_EXECUTION_CONFIG, EVIDENCE_CONFIG
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Frames are acquired on the decode workers (GalaxyCamera.read), so there is no
+# separate acquisition role until a dedicated acquisition thread exists
+ROLES = ('decode', 'io')
+
+_HAS_AFFINITY = hasattr(os, 'sched_setaffinity')
+
+# CPUs the process was allowed to use at startup; threads of roles without a
+# core set are reset to this so they don't inherit another role's pinning
+_PROCESS_CPUS: Optional[Set[int]] = os.sched_getaffinity(0) if _HAS_AFFINITY else None
+
+
+def parse_cpu_list(spec: Optional[str]) -> Optional[Set[int]]:
+    """
+    Parse a Linux style CPU list such as '0-1,4'
+
+    :param spec: CPU list string; empty or None means no pinning
+    :return: Set of CPU indexes, or None if no CPUs are given
+    """
+    if not spec or not spec.strip():
+        return None
+    cpus = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(v) for v in part.split('-', 1))
+            if end < start:
+                raise ValueError(f"Invalid CPU range: {part}")
+            cpus.update(range(start, end + 1))
+        else:
+            cpus.add(int(part))
+    return cpus or None
+
+
+def get_role_cpus(role: str) -> Optional[Set[int]]:
+    """
+    Get the configured core set of a subsystem, restricted to the CPUs available
+
+    :param role: One of 'decode' or 'io'
+    :return: Set of CPU indexes, or None if the role is not pinned
+    """
+    if role not in ROLES:
+        raise ValueError(f"Unknown resource role: {role}")
+    cpus = parse_cpu_list(RESOURCE_CONFIG['cpus'][role])
+    if cpus is None or _PROCESS_CPUS is None:
+        return cpus
+    available = cpus & _PROCESS_CPUS
+    if available != cpus:
+        logger.warning(f"CPUs {sorted(cpus - _PROCESS_CPUS)} for {role} are not available")
+    return available or None
+
+
+def pin_current_thread(role: str):
+    """
+    Pin the calling thread to the core set of a subsystem
+
+    Intended as a thread initializer. On Linux ``sched_setaffinity(0, ...)``
+    applies to the calling thread only. Threads of roles without a core set
+    are reset to the CPUs the process started with.
+
+    :param role: One of 'decode' or 'io'
+    """
+    if not _HAS_AFFINITY:
+        return
+    cpus = get_role_cpus(role) or _PROCESS_CPUS
+    try:
+        os.sched_setaffinity(0, cpus)
+    except OSError as e:
+        logger.warning(f"Failed to pin {role} thread {threading.current_thread().name}: {e}")
+
+
+def apply_resource_config() -> Dict[str, Dict[str, object]]:
+    """
+    Apply the OpenCV thread budget, pin the calling (network I/O) thread and
+    log the effective layout
+
+    :return: Effective layout per subsystem
+    """
+    opencv_threads = RESOURCE_CONFIG['opencv_threads']
+    if opencv_threads >= 0:
+        cv2.setNumThreads(opencv_threads)
+
+    pin_current_thread('io')
+
+    layout = {
+        'opencv': {'threads': cv2.getNumThreads(), 'cpus': None},
+        'decode': {'threads': TASK_EXECUTION_CONFIG['workers'], 'cpus': get_role_cpus('decode')},
+        'io': {'threads': 1 + (EVIDENCE_CONFIG['workers'] if EVIDENCE_CONFIG['enabled'] else 0),
+               'cpus': get_role_cpus('io')},
+    }
+    report_layout(layout)
+    return layout
+
+
+def report_layout(layout: Dict[str, Dict[str, object]]):
+    """
+    Log the effective thread and core layout
+
+    :param layout: Layout as returned by :func:`apply_resource_config`
+    """
+    available = sorted(_PROCESS_CPUS) if _PROCESS_CPUS is not None else f'{os.cpu_count()} (no affinity support)'
+    logger.info(f"Runtime resources - available CPUs: {available}")
+    for name, entry in layout.items():
+        cpus = sorted(entry['cpus']) if entry['cpus'] else 'unpinned'
+        logger.info(f"Runtime resources - {name}: threads={entry['threads']}, cpus={cpus}")